@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
+import argparse
+import asyncio
+import atexit
+import csv
+from html import unescape as unescape_entities
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from glob import glob
 import os
+import re
+import socket
+import threading
 from urllib.parse import unquote, urlparse
 from ftplib import FTP
-from bs4 import BeautifulSoup
-import requests
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -13,22 +24,22 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.common.keys import Keys
-from fake_useragent import UserAgent
 import markdown
+from tqdm import tqdm
 
 # Use this to fake a valid user agent for requests
-ua = UserAgent()
-headers = {"User-Agent": ua.Chrome}
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+headers = {"User-Agent": USER_AGENT}
 
 options = Options()
 options.headless = True
 
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()), options=options
-)
-
 DEAD_LINKS_FILE = "./dead-links.tsv"
 DEAD_ANCHORS_FILE = "./dead-anchors.tsv"
+HTTP_CACHE_FILE = "./.linkcheck_cache.sqlite"
 
 UNIPROT_BETA_HELP_URL = "https://beta.uniprot.org/help"
 UNIPROT_ORG_URL = "www.uniprot.org"
@@ -36,7 +47,122 @@ UNIPROT_BETA_URL = "beta.uniprot.org"
 UNIPROT_ORG_KB_PATH = "/uniprot"
 UNIPROT_BETA_KB_PATH = "/uniprotkb"
 
+# uniprot is now uniprotkb and /manual redirects to /help
+PATH_REWRITES = {UNIPROT_ORG_KB_PATH: UNIPROT_BETA_KB_PATH, "/manual": "/help"}
+
+# Only the links of a help page are of interest
+only_a = SoupStrainer("a")
+
+# Patterns for finding links in markdown without rendering it, they follow
+# what Python-Markdown does so that both find the same links
+BLOCK_LEVEL_TAGS = (
+    "address|article|aside|blockquote|details|div|dl|fieldset|figcaption|figure|"
+    "footer|form|h[1-6]|header|hgroup|hr|main|menu|nav|ol|p|pre|section|table|"
+    "ul|canvas|colgroup|dd|body|dt|group|iframe|li|legend|math|map|noscript|"
+    "output|object|option|progress|script|style|summary|tbody|td|textarea|"
+    "tfoot|th|thead|tr|video"
+)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link"}
+VOID_TAGS |= {"meta", "param", "source", "track", "wbr"}
+HTML_BLOCK_RE = re.compile(
+    rf"^[ ]{{0,3}}(?=<!--|<(?:{BLOCK_LEVEL_TAGS})[\s/>])", re.MULTILINE | re.IGNORECASE
+)
+HTML_TAG_RE = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][\w-]*)[^>]*?(/?)>", re.DOTALL)
+HTML_HREF_RE = re.compile(
+    r"""<a\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE
+)
+REFERENCE_RE = re.compile(
+    r"^[ ]{0,3}\[([^\]]*)\]:[ ]*\n?[ ]*([^\s]+)[ ]*(?:\n[ ]*)?"
+    r"""((["'])(.*)\4[ ]*|\((.*)\)[ ]*)?$""",
+    re.MULTILINE,
+)
+LIST_ITEM_RE = re.compile(r"^[ ]{0,3}(?:\d+\.|[*+-])[ ]+")
+QUOTE_RE = re.compile(r"^[ ]{0,3}>[ ]?", re.MULTILINE)
+CODE_SPAN_RE = re.compile(
+    r"(?:(?<!\\)((?:\\{2})+)(?=`+)|(?<!\\)(`+)(.+?)(?<!`)\2(?!`))", re.DOTALL
+)
+ESCAPED_CHARS = "\\`*_{}[]()>#+-.!"
+ESCAPE_RE = re.compile(r"\\(.)")
+ANGLE_LINK_RE = re.compile(r"""\(\s*(<[^<>]*>)\s*(?:('[^']*'|"[^"]*")\s*)?\)""")
+REFERENCE_ID_RE = re.compile(r"\s?\[([^\]]*)\]")
+AUTOLINK_RE = re.compile(r"<((?:[Ff]|[Hh][Tt])[Tt][Pp][Ss]?://[^<>]*)>")
+AUTOMAIL_RE = re.compile(r"<([^<> !]+@[^@<> ]+)>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Escaped characters are swapped for private use code points while scanning
+ESCAPE_OFFSET = 0xE000
+UNESCAPE_TABLE = {ESCAPE_OFFSET + i: char for i, char in enumerate(ESCAPED_CHARS)}
+
+ERROR_SELECTOR = ".message--failure, .error-page-container__art-work"
+
+# Looks for the error markers and the anchor in a single WebDriver round trip
+PAGE_STATE_SCRIPT = """
+return {
+    error: !!document.querySelector(arguments[0]),
+    anchor: arguments[1] ? !!document.getElementById(arguments[1]) : null,
+};
+"""
+
 TIMEOUT = 5
+REQUEST_TIMEOUT = 10
+CONCURRENCY = 64
+# Most links point at the same few hosts, which shouldn't take every slot
+CONCURRENCY_PER_HOST = 8
+QUEUE_SIZE = 1000
+SELENIUM_WORKERS = 8
+FTP_WORKERS = 4
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+# Throttled or overloaded servers are worth asking again
+RETRY_STATUSES = {429, 503}
+# Only these mean a beta page is gone, other errors may be transient
+DEAD_STATUSES = {404, 410}
+HTTP_CACHE_EXPIRY = 24 * 60 * 60
+
+# Only the request itself is timed, not the wait for a free connection to
+# its host
+request_timeout = aiohttp.ClientTimeout(
+    sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT
+)
+
+# Pending or finished link checks keyed on canonical URL so that links
+# repeated across help files are only checked once
+url_checks = {}
+
+# Set from the command line, without it client side rendered pages are only
+# checked as far as their served HTML allows
+use_selenium = True
+
+# Browser checks run on these threads, each with its own browser
+executor = ThreadPoolExecutor(max_workers=SELENIUM_WORKERS)
+thread_data = threading.local()
+
+# FTP checks are serialised per host so a few threads cover all the hosts
+# without a stalled FTP server holding up the browsers
+ftp_executor = ThreadPoolExecutor(max_workers=FTP_WORKERS)
+
+# Resolved addresses of the FTP hosts, aiohttp keeps its own DNS cache
+dns_cache = {}
+
+# Logged in FTP connections keyed on host, each only used under its host's lock
+ftp_connections = {}
+ftp_locks = {}
+
+
+@lru_cache(maxsize=None)
+def get_chromedriver_path():
+    # Set CHROMEDRIVER_PATH to skip looking up and downloading chromedriver
+    return os.environ.get("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+
+
+def get_driver():
+    if not hasattr(thread_data, "driver"):
+        driver = webdriver.Chrome(
+            service=Service(get_chromedriver_path()), options=options
+        )
+        atexit.register(driver.quit)
+        thread_data.driver = driver
+    return thread_data.driver
 
 
 def get_beta_help_url(help_file):
@@ -45,119 +171,504 @@ def get_beta_help_url(help_file):
     return os.path.join(UNIPROT_BETA_HELP_URL, filename)
 
 
-def does_page_exist(url):
+async def retry_request(semaphore, request):
+    # Returns None if the request kept failing on the network
+    for attempt in range(MAX_RETRIES + 1):
+        # Back off without holding on to a request slot
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        async with semaphore:
+            try:
+                return await request()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                continue
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES:
+                    raise
+                continue
+    return None
+
+
+def raise_for_retry_status(response):
+    # Lets retry_request treat throttling like a network error
+    if response.status in RETRY_STATUSES:
+        response.raise_for_status()
+
+
+async def get_page_status(session, url):
+    async with session.head(
+        url, headers=headers, timeout=request_timeout, allow_redirects=True
+    ) as response:
+        if response.status < 400:
+            return response.status
+    # Some servers reject or don't implement HEAD so only GET decides whether
+    # the page is dead, the body is never read and gets discarded when the
+    # response is released
+    async with session.get(
+        url, headers=headers, timeout=request_timeout, allow_redirects=True
+    ) as response:
+        raise_for_retry_status(response)
+        return response.status
+
+
+async def get_page(session, url):
+    async with session.get(url, headers=headers, timeout=request_timeout) as response:
+        raise_for_retry_status(response)
+        if response.status >= 400:
+            return response.status, None
+        return response.status, await response.text()
+
+
+async def does_page_exist(session, semaphore, url):
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-    except:
+        status = await retry_request(semaphore, lambda: get_page_status(session, url))
+    except Exception:
         return False
-    return response.ok
+    return status is not None and status < 400
 
 
 def is_anchor_in_page(anchor):
+    driver = get_driver()
     try:
         WebDriverWait(driver, TIMEOUT).until(
             EC.presence_of_element_located((By.ID, anchor))
         )
     except:
         return False
-    return len(driver.find_elements(by=By.ID, value=anchor)) > 0
+    return True
 
 
 def is_error():
-    error_xpath = (
-        "//*[@class='message--failure' or @class='error-page-container__art-work']"
-    )
+    driver = get_driver()
     try:
         WebDriverWait(driver, TIMEOUT).until(
-            EC.presence_of_element_located((By.XPATH, error_xpath))
+            EC.presence_of_element_located((By.CSS_SELECTOR, ERROR_SELECTOR))
         )
     except:
         return False
-    return driver.find_elements(by=By.XPATH, value=error_xpath), None
+    return driver.find_elements(by=By.CSS_SELECTOR, value=ERROR_SELECTOR), None
 
 
-def is_uniprot_beta_url_ok(parsed):
+def is_uniprot_beta_url_ok_in_browser(parsed):
     url = parsed.geturl()
     assert UNIPROT_BETA_URL in url
+    driver = get_driver()
     driver.get(url)
-    not_found_class_names = ["message--failure", "error-page-container__art-work"]
-    for class_name in not_found_class_names:
-        if driver.find_elements(by=By.CLASS_NAME, value=class_name):
-            return False, None
-    if parsed.fragment:
-        return True, is_anchor_in_page(unquote(parsed.fragment))
+    anchor = unquote(parsed.fragment) or None
+    state = driver.execute_script(PAGE_STATE_SCRIPT, ERROR_SELECTOR, anchor)
+    if state["error"]:
+        return False, None
+    if anchor:
+        # Only wait for the anchor if it hasn't been rendered yet
+        return True, state["anchor"] or is_anchor_in_page(anchor)
 
     return True, None
 
 
-def is_ftp_url_ok(parsed):
-    try:
-        ftp = FTP(parsed.netloc)
-        ftp.login()
-        path = unquote(parsed.path)
-    except:
-        return False
+def find_in_served_html(html, anchor):
+    soup = BeautifulSoup(html, features="lxml")
+    if soup.select_one(ERROR_SELECTOR):
+        return False, None
+    if anchor and soup.find(id=anchor):
+        return True, True
+    return None
+
+
+async def is_uniprot_beta_url_ok(session, semaphore, parsed):
+    url = parsed.geturl()
+    assert UNIPROT_BETA_URL in url
+    anchor = unquote(parsed.fragment)
+    loop = asyncio.get_running_loop()
     try:
-        ftp.cwd(path)
-        return True
-    except:
+        page = await retry_request(semaphore, lambda: get_page(session, url))
+    except Exception:
+        page = None
+
+    # Only a missing page is dead, if it couldn't be fetched at all or the
+    # server is struggling the browser gets to decide
+    if page is not None:
+        status, html = page
+        if status in DEAD_STATUSES:
+            return False, None
+        if status >= 400:
+            page = None
+        else:
+            # Parsed off the event loop so the other checks keep going
+            result = await loop.run_in_executor(None, find_in_served_html, html, anchor)
+            if result is not None:
+                return result
+
+    # Nothing conclusive in the served HTML, most likely because the page is
+    # rendered client side, so load it in a browser
+    if use_selenium:
+        return await loop.run_in_executor(
+            executor, is_uniprot_beta_url_ok_in_browser, parsed
+        )
+    if page is None:
+        return None, None
+    # Anchors can't be verified without rendering the page
+    return True, None
+
+
+def resolve(host):
+    if host not in dns_cache:
+        dns_cache[host] = socket.gethostbyname(host)
+    return dns_cache[host]
+
+
+def get_ftp_connection(host):
+    ftp = ftp_connections.get(host)
+    if ftp is not None:
         try:
-            ftp.size(path)
-            return True
+            ftp.voidcmd("NOOP")
+            return ftp
+        except:
+            pass
+    ftp = FTP(resolve(host), timeout=REQUEST_TIMEOUT)
+    ftp.login()
+    ftp_connections[host] = ftp
+    return ftp
+
+
+@atexit.register
+def close_ftp_connections():
+    for ftp in ftp_connections.values():
+        try:
+            ftp.quit()
+        except:
+            pass
+
+
+def is_ftp_url_ok(parsed):
+    with ftp_locks.setdefault(parsed.netloc, threading.Lock()):
+        try:
+            ftp = get_ftp_connection(parsed.netloc)
+            path = unquote(parsed.path)
         except:
             return False
+        try:
+            ftp.cwd(path)
+            return True
+        except:
+            try:
+                ftp.size(path)
+                return True
+            except:
+                return False
+
+
+def get_beta_url(parsed):
+    path = parsed.path
+    lower_path = path.lower()
+    for old, new in PATH_REWRITES.items():
+        if lower_path == old or lower_path.startswith(old + "/"):
+            path = new + path[len(old) :]
+            break
 
+    # Always use HTTPS
+    return parsed._replace(scheme="https", netloc=UNIPROT_BETA_URL, path=path)
 
-def is_url_ok(url):
+
+@lru_cache(maxsize=None)
+def normalize(url):
     parsed = urlparse(url)
+    parsed = parsed._replace(netloc=parsed.netloc.lower())
     if parsed.scheme == "ftp":
-        return is_ftp_url_ok(parsed), None
-    paths = os.path.split(parsed.path)
+        return parsed
 
     # If nothing as hostname assume this to be uniprot
     if parsed.hostname is None:
         parsed = parsed._replace(netloc=UNIPROT_ORG_URL)
 
-    # Check if this is uniprot.org
+    # Check the corresponding beta page for uniprot.org
     if parsed.hostname == UNIPROT_ORG_URL:
-        # Always use HTTPS
-        parsed = parsed._replace(scheme="https")
-
-        # Check if this uniprot(kb) and if so replace path
-        if paths[0].lower() == UNIPROT_ORG_KB_PATH:
-            paths = [UNIPROT_BETA_KB_PATH, *paths[1:]]
-            parsed = parsed._replace(path=os.path.join(*paths))
-
-        # /manual redirects to /help now
-        elif paths[0] == "/manual":
-            paths = ["/help/", *paths[1:]]
-            parsed = parsed._replace(path=os.path.join(*paths))
-
-        # Check that the corresponding beta page exists
-        beta_parsed = parsed._replace(netloc=UNIPROT_BETA_URL)
-        ok, anchor_found = is_uniprot_beta_url_ok(beta_parsed)
-        return ok, anchor_found
-    else:
-        # Well this isn't ideal but not sure how else to handle this
-        # as if the resource is a SPA I won't know what to look for
-        # the resource not being able to be accessed
-        return does_page_exist(url), None
-
-
-def check_and_standardize_all_links(soup):
-    _dead_links = []
-    _dead_anchors = []
-    for el in soup.find_all("a"):
-        if "href" not in el.attrs:
-            _dead_links.append(f'Anchor tag: {",".join(el.attrs.values())}')
+        return get_beta_url(parsed)
+
+    return parsed
+
+
+async def check_url(session, semaphore, parsed):
+    if parsed.scheme == "ftp":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(ftp_executor, is_ftp_url_ok, parsed), None
+
+    if parsed.hostname == UNIPROT_BETA_URL:
+        return await is_uniprot_beta_url_ok(session, semaphore, parsed)
+
+    # Well this isn't ideal but not sure how else to handle this
+    # as if the resource is a SPA I won't know what to look for
+    # the resource not being able to be accessed
+    return await does_page_exist(session, semaphore, parsed.geturl()), None
+
+
+def is_url_ok(session, semaphore, parsed):
+    key = parsed.geturl()
+    if key not in url_checks:
+        url_checks[key] = asyncio.ensure_future(check_url(session, semaphore, parsed))
+    return url_checks[key]
+
+
+def find_html_block_end(md, start):
+    stack = []
+    for m in HTML_TAG_RE.finditer(md, start):
+        closing, tag, self_closing = m.groups()
+        if tag is None:
+            # Comment
+            pass
+        elif closing:
+            tag = tag.lower()
+            while tag in stack and stack.pop() != tag:
+                pass
+        elif not self_closing and tag.lower() not in VOID_TAGS:
+            stack.append(tag.lower())
+        if not stack:
+            return m.end()
+    return len(md)
+
+
+def split_raw_html(md):
+    # Markdown inside block level HTML is passed through untouched
+    chunks = []
+    raw_html = []
+    pos = 0
+    for m in HTML_BLOCK_RE.finditer(md):
+        if m.start() < pos:
             continue
-        url = el.attrs["href"]
-        ok, anchor_found = is_url_ok(url)
-        if ok is not None and not ok:
-            _dead_links.append(url)
-        if anchor_found is not None and not anchor_found:
-            _dead_anchors.append(url)
-    return set(_dead_links), set(_dead_anchors)
+        end = find_html_block_end(md, m.end())
+        chunks.append(md[pos : m.start()])
+        raw_html.append(md[m.end() : end])
+        pos = end
+    chunks.append(md[pos:])
+    return "\n\n".join(chunks), raw_html
+
+
+def collect_markdown_text(md, texts, references):
+    # Gathers the text that gets inline markdown processing, leaving out code
+    # blocks and registering reference definitions along the way
+    after_list = False
+    for block in re.split(r"\n[ ]*\n", md):
+        if not block.strip():
+            continue
+        if block.startswith(" " * 4):
+            if after_list:
+                # Content of the list item above
+                item = re.sub(r"^[ ]{1,4}", "", block, flags=re.MULTILINE)
+                collect_markdown_text(item, texts, references)
+                continue
+            # Code block, any lines after it that aren't indented are markdown
+            lines = block.split("\n")
+            while lines and lines[0].startswith(" " * 4):
+                lines.pop(0)
+            block = "\n".join(lines)
+            if not block.strip():
+                continue
+        if QUOTE_RE.match(block):
+            collect_markdown_text(QUOTE_RE.sub("", block), texts, references)
+            after_list = False
+            continue
+        after_list = bool(LIST_ITEM_RE.match(block))
+        for m in REFERENCE_RE.finditer(block):
+            references[m.group(1).strip().lower()] = m.group(2).lstrip("<").rstrip(">")
+        texts.append(REFERENCE_RE.sub("", block))
+
+
+def escape(match):
+    char = match.group(1)
+    if char in ESCAPED_CHARS:
+        return chr(ESCAPE_OFFSET + ESCAPED_CHARS.index(char))
+    return match.group(0)
+
+
+def unescape(text):
+    return text.translate(UNESCAPE_TABLE)
+
+
+def get_html_href(match):
+    return next(group for group in match.groups() if group is not None)
+
+
+def get_label(text, index):
+    depth = 1
+    for pos in range(index, len(text)):
+        if text[pos] == "[":
+            depth += 1
+        elif text[pos] == "]":
+            depth -= 1
+            if depth == 0:
+                return text[index:pos], pos + 1
+    return None, None
+
+
+def get_destination(text, index):
+    m = ANGLE_LINK_RE.match(text, index)
+    if m:
+        return unescape(m.group(1)[1:-1]).strip(), m.end()
+    depth = 0
+    for pos in range(index, len(text)):
+        if text[pos] == "(":
+            depth += 1
+        elif text[pos] == ")":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None, None
+    destination = text[index + 1 : pos]
+    # A quoted string closing the brackets is the title
+    for quote in dict.fromkeys(char for char in destination if char in "\"'"):
+        if destination.rstrip().endswith(quote) and destination.count(quote) > 1:
+            destination = destination[: destination.index(quote)]
+            break
+    return unescape(destination).strip(), pos + 1
+
+
+def match_link(text, index, references):
+    label, end = get_label(text, index + 1)
+    if label is None:
+        return None
+    if text.startswith("(", end):
+        href, link_end = get_destination(text, end)
+        if href is not None:
+            return href, label, link_end
+    m = REFERENCE_ID_RE.match(text, end)
+    if m:
+        reference = WHITESPACE_RE.sub(" ", (m.group(1) or label).lower())
+        if reference in references:
+            return references[reference], label, m.end()
+    reference = WHITESPACE_RE.sub(" ", label.lower())
+    if reference in references:
+        return references[reference], label, end
+    return None
+
+
+def find_inline_links(text, references):
+    links = []
+    index = 0
+    while index < len(text):
+        if text[index] == "[":
+            is_image = index > 0 and text[index - 1] == "!"
+            match = match_link(text, index, references)
+            if match:
+                href, label, index = match
+                # Images can sit inside link text but aren't links themselves
+                if not is_image:
+                    links.append(href)
+                    links.extend(find_inline_links(label, references))
+                continue
+        elif text[index] == "<":
+            m = AUTOLINK_RE.match(text, index)
+            if m:
+                links.append(unescape(m.group(1)))
+            else:
+                m = AUTOMAIL_RE.match(text, index)
+                if m:
+                    email = unescape(m.group(1))
+                    if email.startswith("mailto:"):
+                        email = email[len("mailto:") :]
+                    links.append(f"mailto:{email}")
+                else:
+                    m = HTML_HREF_RE.match(text, index)
+                    if m:
+                        links.append(get_html_href(m))
+            if m:
+                index = m.end()
+                continue
+        index += 1
+    return links
+
+
+def find_links(md):
+    md, raw_html = split_raw_html(md.expandtabs(4))
+    texts = []
+    references = {}
+    collect_markdown_text(md, texts, references)
+    links = [
+        get_html_href(m) for chunk in raw_html for m in HTML_HREF_RE.finditer(chunk)
+    ]
+    for text in texts:
+        text = CODE_SPAN_RE.sub(lambda m: m.group(1) or " ", text)
+        text = ESCAPE_RE.sub(escape, text)
+        links.extend(find_inline_links(text, references))
+    # Entities are decoded once the links end up in HTML
+    return [unescape_entities(link) for link in links]
+
+
+def find_anchor_tags(md):
+    html = markdown.markdown(md)
+    soup = BeautifulSoup(html, features="lxml", parse_only=only_a)
+    return soup.find_all("a")
+
+
+def get_links(help_file, strict=False):
+    with open(help_file) as f:
+        md = f.read()
+    dead_links = set()
+    if strict:
+        # Also reports anchor tags that have no link at all
+        anchor_tags = find_anchor_tags(md)
+        dead_links = {
+            f'Anchor tag: {",".join(el.attrs.values())}'
+            for el in anchor_tags
+            if not el.has_attr("href")
+        }
+        urls = {el["href"] for el in anchor_tags if el.has_attr("href")}
+    else:
+        urls = set(find_links(md))
+
+    # Links repeated within the page are only normalized and checked once
+    links = {}
+    for url in urls:
+        try:
+            links[url] = normalize(url)
+        except ValueError:
+            # Malformed links can't be followed at all
+            dead_links.add(url)
+    return links, dead_links
+
+
+async def parse_help_file(process_pool, help_file, strict, progress):
+    loop = asyncio.get_running_loop()
+    try:
+        links, dead_links = await loop.run_in_executor(
+            process_pool, get_links, help_file, strict
+        )
+    except Exception as e:
+        progress.write(f"{help_file}: {e}")
+        return help_file, {}, set()
+    return help_file, links, dead_links
+
+
+async def produce_links(process_pool, help_files, strict, queue, writers, progress):
+    # Pages are parsed on all cores while links already queued are checked
+    parsed_pages = [
+        parse_help_file(process_pool, help_file, strict, progress)
+        for help_file in help_files
+    ]
+    for parsed_page in asyncio.as_completed(parsed_pages):
+        help_file, links, dead_links = await parsed_page
+        beta_help_url = get_beta_help_url(help_file)
+        for dead_link in dead_links:
+            writers["link"].writerow([beta_help_url, dead_link])
+        progress.total += len(links)
+        progress.refresh()
+        for url, parsed in links.items():
+            await queue.put((beta_help_url, url, parsed))
+
+
+async def check_queued_links(session, semaphore, queue, writers, progress):
+    while True:
+        beta_help_url, url, parsed = await queue.get()
+        try:
+            ok, anchor_found = await is_url_ok(session, semaphore, parsed)
+            if ok is not None and not ok:
+                writers["link"].writerow([beta_help_url, url])
+            if anchor_found is not None and not anchor_found:
+                writers["anchor"].writerow([beta_help_url, url])
+        except Exception as e:
+            progress.write(f"{beta_help_url}\t{url}: {e}")
+        finally:
+            progress.update()
+            queue.task_done()
 
 
 def remove_if_exists(path):
@@ -165,31 +676,110 @@ def remove_if_exists(path):
         os.remove(path)
 
 
-if __name__ == "__main__":
+def parse_limit(value):
+    try:
+        limit = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {value!r}")
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"limit must be at least 1, got {value!r}")
+    return limit
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, got {value!r}")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index out of range in {value!r}")
+    return index, count
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Check the links in the UniProt help pages"
+    )
+    parser.add_argument(
+        "--no-selenium",
+        action="store_true",
+        help="only check the HTML served for beta pages without rendering them",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="render the markdown to HTML and also report anchor tags without a link",
+    )
+    parser.add_argument(
+        "--limit",
+        type=parse_limit,
+        default=None,
+        help="only check the first LIMIT help files of the shard",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        metavar="INDEX/COUNT",
+        help="only check every COUNT-th help file starting from INDEX",
+    )
+    return parser.parse_args()
+
+
+async def main(args):
+    global use_selenium
+    use_selenium = not args.no_selenium
 
     remove_if_exists(DEAD_ANCHORS_FILE)
     remove_if_exists(DEAD_LINKS_FILE)
 
-    help_files = glob("./uniprot-manual/help/*.md")
+    # Sorted so that shards split the same list on every machine
+    shard_index, shard_count = args.shard
+    help_files = sorted(glob("./uniprot-manual/help/*.md"))
+    help_files = help_files[shard_index::shard_count][: args.limit]
+
+    # Install chromedriver once up front rather than in every worker
+    if use_selenium:
+        get_chromedriver_path()
+
+    connector = aiohttp.TCPConnector(
+        limit=CONCURRENCY,
+        limit_per_host=CONCURRENCY_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=600,
+        resolver=aiohttp.AsyncResolver(),
+    )
+    # Only successful responses are cached so dead links are checked every run
+    cache = SQLiteBackend(
+        cache_name=HTTP_CACHE_FILE,
+        expire_after=HTTP_CACHE_EXPIRY,
+        cache_control=True,
+    )
+    async with CachedSession(cache=cache, connector=connector) as session:
+        with open(DEAD_ANCHORS_FILE, "w", newline="") as af, open(
+            DEAD_LINKS_FILE, "w", newline=""
+        ) as lf, ProcessPoolExecutor() as process_pool:
+            anchors_writer = csv.writer(af, delimiter="\t", lineterminator="\n")
+            links_writer = csv.writer(lf, delimiter="\t", lineterminator="\n")
+            writers = {"link": links_writer, "anchor": anchors_writer}
+            queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            # Caps the number of HTTP requests in flight at any one time
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+            with tqdm(total=0, unit="link") as progress:
+                workers = [
+                    asyncio.create_task(
+                        check_queued_links(session, semaphore, queue, writers, progress)
+                    )
+                    for _ in range(CONCURRENCY)
+                ]
+                await produce_links(
+                    process_pool, help_files, args.strict, queue, writers, progress
+                )
+                await queue.join()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
 
-    all_dead_links = []
-    all_dead_anchors = []
 
-    with open(DEAD_ANCHORS_FILE, "w") as af, open(DEAD_LINKS_FILE, "w") as lf:
-        for i, help_file in enumerate(help_files):
-            try:
-                print(help_file)
-                with open(help_file) as f:
-                    md = f.read()
-                html = markdown.markdown(md)
-                soup = BeautifulSoup(html, features="html.parser")
-                dead_links, dead_anchors = check_and_standardize_all_links(soup)
-                beta_help_url = get_beta_help_url(help_file)
-                for dead_link in dead_links:
-                    print(f"{beta_help_url}\t{dead_link}", file=lf)
-                    lf.flush()
-                for dead_anchor in dead_anchors:
-                    print(f"{beta_help_url}\t{dead_anchor}", file=af)
-                    af.flush()
-            except Exception as e:
-                print(e)
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,42 @@
+import os
+from glob import glob
+
+import pytest
+
+from main import find_anchor_tags, find_links
+
+HERE = os.path.dirname(__file__)
+
+# The help pages of the uniprot-manual submodule are compared too when it is
+# checked out
+HELP_FILES = sorted(glob(os.path.join(HERE, "fixtures", "help", "*.md"))) + sorted(
+    glob(os.path.join(HERE, "..", "uniprot-manual", "help", "*.md"))
+)
+
+
+@pytest.mark.parametrize("help_file", HELP_FILES, ids=os.path.basename)
+def test_find_links_matches_rendered_markdown(help_file):
+    with open(help_file) as f:
+        md = f.read()
+    rendered = {el["href"] for el in find_anchor_tags(md) if el.has_attr("href")}
+    assert set(find_links(md)) == rendered
+
+
+@pytest.mark.parametrize(
+    "md, links",
+    [
+        ("[![logo](img/logo.png)](https://example.org/x)", ["https://example.org/x"]),
+        (
+            "[Foo](https://en.wikipedia.org/wiki/Foo_(bar))",
+            ["https://en.wikipedia.org/wiki/Foo_(bar)"],
+        ),
+        ("[a [b] c](https://x.org)", ["https://x.org"]),
+        ("<ftp://ftp.uniprot.org/pub>", ["ftp://ftp.uniprot.org/pub"]),
+        ("x `[a](b)` y", []),
+        ("para\n\n    [c](d)\n", []),
+        ("[^1]: see the note", []),
+        ('[a](http://x "title") [b][ref]\n\n[ref]: http://y', ["http://x", "http://y"]),
+    ],
+)
+def test_find_links(md, links):
+    assert find_links(md) == links